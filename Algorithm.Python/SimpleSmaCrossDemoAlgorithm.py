@@ -12,6 +12,7 @@
 # limitations under the License.
 
 from AlgorithmImports import *
+from collections import deque
 
 
 ### <summary>
@@ -31,8 +32,8 @@ class SimpleSmaCrossDemoAlgorithm(QCAlgorithm):
         self._fast_period = 20
         self._slow_period = 50
 
-        self._fast = self.sma(self._symbol, self._fast_period, Resolution.DAILY)
-        self._slow = self.sma(self._symbol, self._slow_period, Resolution.DAILY)
+        self._fast = _RunningSMA(self._fast_period)
+        self._slow = _RunningSMA(self._slow_period)
 
         price_chart = Chart(self._ticker)
         price_chart.add_series(Series("Price", SeriesType.LINE, 0))
@@ -42,27 +43,44 @@ class SimpleSmaCrossDemoAlgorithm(QCAlgorithm):
         price_chart.add_series(Series("Sell", SeriesType.SCATTER, 0))
         self.add_chart(price_chart)
 
-        # Ensure indicators are ready before trading
-        self.set_warm_up(self._slow_period, Resolution.DAILY)
+        # Seed the SMAs from a single history request so they are ready before
+        # the first live bar, instead of pumping warm-up bars through on_data
+        history = self.history[TradeBar](self._symbol, self._slow_period, Resolution.DAILY)
+        for bar in history:
+            self._fast.update(bar.close)
+            self._slow.update(bar.close)
 
         self._was_fast_above = None
+        self._last_plot_day = None
+        self._ready = False
 
     def on_data(self, data: Slice):
-        if self.is_warming_up:
-            return
-
-        if not (self._fast.is_ready and self._slow.is_ready):
-            return
-
         if not data.contains_key(self._symbol) or data[self._symbol] is None:
             return
 
         bar = data[self._symbol]
-        self.plot(self._ticker, "Price", bar.close)
-        self.plot(self._ticker, "FastSMA", self._fast.current.value)
-        self.plot(self._ticker, "SlowSMA", self._slow.current.value)
 
-        is_fast_above = self._fast.current.value > self._slow.current.value
+        self._fast.update(bar.close)
+        self._slow.update(bar.close)
+
+        # Readiness never flips back once satisfied (history seeding normally
+        # covers it from bar one), so latch instead of re-checking every bar
+        if not self._ready:
+            if not (self._fast.is_ready and self._slow.is_ready):
+                return
+            self._ready = True
+
+        is_fast_above = self._fast.value > self._slow.value
+
+        # Plot once per day (a no-op on daily data) plus on every cross, so
+        # minute-resolution runs don't pay three chart dispatches per bar.
+        crossed = self._was_fast_above is not None and is_fast_above != self._was_fast_above
+        day = self.time.date()
+        if crossed or day != self._last_plot_day:
+            self._last_plot_day = day
+            self.plot(self._ticker, "Price", bar.close)
+            self.plot(self._ticker, "FastSMA", self._fast.value)
+            self.plot(self._ticker, "SlowSMA", self._slow.value)
 
         # Initialize state without trading on the first ready sample
         if self._was_fast_above is None:
@@ -83,8 +101,33 @@ class SimpleSmaCrossDemoAlgorithm(QCAlgorithm):
         if order_event.status != OrderStatus.FILLED:
             return
 
+        # Pull each field across the Python/C# bridge once; those lookups cost
+        # far more than plain attribute access
+        quantity = order_event.fill_quantity
+        if quantity == 0:
+            return
+
         # Use fill price so markers align with actual fills (e.g. MarketOnOpen for daily data)
-        if order_event.fill_quantity > 0:
-            self.plot(self._ticker, "Buy", order_event.fill_price)
-        elif order_event.fill_quantity < 0:
-            self.plot(self._ticker, "Sell", order_event.fill_price)
+        self.plot(self._ticker, "Buy" if quantity > 0 else "Sell", order_event.fill_price)
+
+
+# Incremental simple moving average: keeps a running sum over a fixed-size
+# ring buffer so each update is O(1) instead of re-summing the window.
+class _RunningSMA:
+    def __init__(self, period: int) -> None:
+        self._buffer = deque(maxlen=period)
+        self._sum = 0.0
+        self.value = 0.0
+
+    @property
+    def is_ready(self) -> bool:
+        return len(self._buffer) == self._buffer.maxlen
+
+    def update(self, input: float) -> bool:
+        input = float(input)
+        if len(self._buffer) == self._buffer.maxlen:
+            self._sum -= self._buffer[0]
+        self._buffer.append(input)
+        self._sum += input
+        self.value = self._sum / len(self._buffer)
+        return self.is_ready
@@ -1,76 +1,160 @@
 import argparse
+import base64
+import gzip
 import json
-from datetime import datetime, timezone
+import mmap
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
 
-def _extract_xy(series: dict) -> tuple[list[int], list[float]]:
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _extract_xy(series: dict) -> tuple[np.ndarray, np.ndarray]:
     # LEAN backtest json stores series values as: [[unixSeconds, y], ...]
     values = series.get("values") or []
-    xs_ms: list[int] = []
-    ys: list[float] = []
+    if not values:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    # Fast path: LEAN emits homogeneous [x, y] pairs, so a single C-level
+    # ndarray build replaces the per-item Python loop.
+    if isinstance(values[0], list):
+        arr = np.asarray(values, dtype=np.float64)
+        xs_ms = arr[:, 0].astype(np.int64) * 1000
+        return xs_ms, arr[:, 1]
+
+    # Slow fallback: {"x": ..., "y": ...} dicts (older/alternative serialization).
+    # Pre-size the buffers and assign by index; LEAN series are homogeneous, so
+    # probing the first element covers the lot and appends/reallocs are avoided.
+    n = len(values)
+    xs_ms = np.empty(n, dtype=np.int64)
+    ys = np.empty(n, dtype=np.float64)
+    j = 0
     for item in values:
-        if isinstance(item, list) and len(item) == 2:
-            x_s, y = item
-        elif isinstance(item, dict) and "x" in item and "y" in item:
-            x_s, y = item["x"], item["y"]
-        else:
+        x_s = item.get("x")
+        y = item.get("y")
+        if x_s is None or y is None:
             continue
-        try:
-            xs_ms.append(int(x_s) * 1000)
-            ys.append(float(y))
-        except Exception:
+        xs_ms[j] = int(x_s) * 1000
+        ys[j] = float(y)
+        j += 1
+    return xs_ms[:j], ys[:j]
+
+
+def _lttb(xs: np.ndarray, ys: np.ndarray, threshold: int) -> tuple[np.ndarray, np.ndarray]:
+    # Largest-Triangle-Three-Buckets downsampling: keeps the first/last points
+    # and, per bucket, the point forming the largest triangle with the
+    # previously kept point and the next bucket's centroid. O(N), preserves
+    # the visual envelope of the series.
+    n = len(xs)
+    if threshold < 3 or n <= threshold:
+        return xs, ys
+
+    x = xs.astype(np.float64)
+    y = ys.astype(np.float64)
+    # Bucket boundaries over the interior points (first/last are always kept).
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    prev = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if hi <= lo:
+            keep[i + 1] = prev = lo
             continue
-    return xs_ms, ys
-
-
-def _ms_to_utc_iso(ms: int) -> str:
-    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-
-
-def _build_trades_table(
-    buy_x: list[int],
-    buy_y: list[float],
-    sell_x: list[int],
-    sell_y: list[float],
-) -> tuple[str, list[tuple[str, str, float]]]:
-    trades: list[tuple[str, str, float]] = []
-    for x, y in zip(buy_x, buy_y):
-        trades.append((_ms_to_utc_iso(x), "BUY", y))
-    for x, y in zip(sell_x, sell_y):
-        trades.append((_ms_to_utc_iso(x), "SELL", y))
-    trades.sort(key=lambda t: t[0])
-
-    rows = []
-    for time_utc, side, price in trades:
-        rows.append(
-            "<tr>"
-            f"<td style=\"padding: 6px; border-bottom: 1px solid #eee;\">{time_utc}</td>"
-            f"<td style=\"padding: 6px; border-bottom: 1px solid #eee;\">{side}</td>"
-            f"<td style=\"padding: 6px; border-bottom: 1px solid #eee; text-align: right;\">{price:.4f}</td>"
-            "</tr>"
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else x[-1]
+        avg_y = y[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else y[-1]
+        area = np.abs(
+            (x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev])
         )
-    return "\n".join(rows) if rows else "<tr><td colspan=\"3\" style=\"padding: 6px;\">No trades</td></tr>", trades
+        prev = lo + int(np.argmax(area))
+        keep[i + 1] = prev
+    return xs[keep], ys[keep]
+
+
+def _sma(y: np.ndarray, n: int) -> np.ndarray:
+    # np.convolve with a uniform kernel is the fast path for a simple moving
+    # average; 'valid' yields len(y) - n + 1 points, aligned to the window end.
+    w = np.full(n, 1.0 / n)
+    return np.convolve(y, w, mode="valid")
+
+
+def _b64_f64(arr: np.ndarray) -> str:
+    # Binary transport for long series: gzip + base64 of raw float64 bytes is
+    # far smaller than decimal text and skips repr() of every float (timestamp
+    # arrays in particular compress heavily). The browser inflates natively via
+    # DecompressionStream. Timestamps in ms fit exactly in a double, so
+    # everything travels as Float64Array.
+    raw = np.ascontiguousarray(arr, dtype=np.float64).tobytes()
+    return base64.b64encode(gzip.compress(raw, compresslevel=6)).decode("ascii")
+
+
+def _jsarr(arr: np.ndarray) -> str:
+    # JS array literal for the small marker series; orjson serializes numpy
+    # arrays directly, skipping the tolist() + per-item repr() round-trip.
+    if orjson is not None:
+        # Column slices out of _extract_xy are views; orjson needs C-contiguous.
+        return orjson.dumps(np.ascontiguousarray(arr), option=orjson.OPT_SERIALIZE_NUMPY).decode("ascii")
+    return json.dumps(arr.tolist())
+
+
+def _trade_events(
+    buy_x: np.ndarray,
+    buy_y: np.ndarray,
+    sell_x: np.ndarray,
+    sell_y: np.ndarray,
+) -> np.recarray:
+    # One time-sorted (timestamp, side, price) record array that both the JS
+    # marker arrays and the trades table are derived from, so the buy/sell
+    # events are merged and sorted exactly once.
+    events = np.rec.fromarrays(
+        [
+            np.concatenate([np.asarray(buy_x, dtype=np.int64), np.asarray(sell_x, dtype=np.int64)]),
+            np.concatenate([np.ones(len(buy_x), dtype=np.int8), -np.ones(len(sell_x), dtype=np.int8)]),
+            np.concatenate([np.asarray(buy_y, dtype=np.float64), np.asarray(sell_y, dtype=np.float64)]),
+        ],
+        names="t,s,p",
+    )
+    # Stable argsort on the timestamps alone: sort(order="t") would fall back
+    # to the side/price fields as tie-breakers, reordering same-timestamp
+    # events (buys must stay ahead of sells, as before the merge).
+    return events[np.argsort(events.t, kind="stable")]
+
+
+def _build_trades_table(events: np.recarray) -> tuple[str, list[tuple[str, str, float]]]:
+    if not len(events):
+        return "<tr><td colspan=\"3\" style=\"padding: 6px;\">No trades</td></tr>", []
+
+    # Format every timestamp in one C-level pass instead of constructing a
+    # datetime object per trade; epoch-ms values are already UTC, and the 'T'
+    # separator is swapped for a space to keep the established format.
+    times = np.char.replace(np.datetime_as_string(events.t.astype("datetime64[ms]"), unit="s"), "T", " ")
+    sides = np.where(events.s > 0, "BUY", "SELL")
+    trades = [
+        (str(time_utc), str(side), float(p))
+        for time_utc, side, p in zip(times, sides, events.p)
+    ]
+    rows = "\n".join(
+        "<tr>"
+        f"<td style=\"padding: 6px; border-bottom: 1px solid #eee;\">{time_utc}</td>"
+        f"<td style=\"padding: 6px; border-bottom: 1px solid #eee;\">{side}</td>"
+        f"<td style=\"padding: 6px; border-bottom: 1px solid #eee; text-align: right;\">{price:.4f}</td>"
+        "</tr>"
+        for time_utc, side, price in trades
+    )
+    return rows, trades
 
 
-def _build_html(
-    *,
-    title: str,
-    price_x: list[int],
-    price_y: list[float],
-    buy_x: list[int],
-    buy_y: list[float],
-    sell_x: list[int],
-    sell_y: list[float],
-    fast_x: list[int],
-    fast_y: list[float],
-    slow_x: list[int],
-    slow_y: list[float],
-    trades_rows_html: str,
-) -> str:
-    # Keep it self-contained: use Plotly CDN, but do NOT block initial render.
-    # Some environments (corporate networks / VS Code webviews) may block the CDN.
-    return f"""<!doctype html>
+# Static template fragments are module-level constants so each invocation
+# only formats the variable payload (title, trades rows, data arrays).
+_HTML_HEAD = """<!doctype html>
 <html>
 <head>
   <meta charset=\"utf-8\" />
@@ -108,119 +192,174 @@ def _build_html(
     </p>
   </div>
 
-  <!-- Load Plotly after the page content so we don't white-screen if the CDN is blocked -->
-  <script src=\"https://cdn.plot.ly/plotly-2.30.0.min.js\" async
-          onerror=\"document.getElementById('chartsStatus').textContent='Plotly failed to load (CDN blocked/offline). Open this file in a normal browser with internet access, or rely on the Trades table above.';\"></script>
+"""
+
+_PLOTLY_CDN_TAG = (
+    "  <script src=\"https://cdn.plot.ly/plotly-2.30.0.min.js\"\n"
+    "          onerror=\"document.getElementById('chartsStatus').textContent="
+    "'Plotly failed to load (CDN blocked/offline). Open this file in a normal browser "
+    "with internet access, or rely on the Trades table above.';\"></script>\n"
+)
 
+_SCRIPT_PRELUDE = """
   <script>
-    const priceX = {price_x};
-    const priceY = {price_y};
-    const buyX   = {buy_x};
-    const buyY   = {buy_y};
-    const sellX  = {sell_x};
-    const sellY  = {sell_y};
-
-    const fastX  = {fast_x};
-    const fastY  = {fast_y};
-    const slowX  = {slow_x};
-    const slowY  = {slow_y};
-
-    function setStatus(msg) {{
+    // Long line series travel as base64-encoded, gzip-compressed raw float64
+    // bytes; inflate with the browser-native DecompressionStream and view the
+    // result as a TypedArray, which Plotly consumes directly.
+    async function decode(b) {
+      const bin = Uint8Array.from(atob(b), c => c.charCodeAt(0));
+      const inflated = new Response(new Blob([bin]).stream().pipeThrough(new DecompressionStream('gzip')));
+      return new Float64Array(await inflated.arrayBuffer());
+    }
+
+"""
+
+_SCRIPT_TAIL = """
+
+    function setStatus(msg) {
       const el = document.getElementById('chartsStatus');
       if (el) el.textContent = msg;
-    }}
+    }
+
+    async function renderCharts() {
+      const [priceX, priceY, fastX, fastY, slowX, slowY] = await Promise.all(
+        [priceXB64, priceYB64, fastXB64, fastYB64, slowXB64, slowYB64].map(decode));
 
-    function renderCharts() {{
       const priceTraces = [
-        {{
+        {
           x: priceX,
           y: priceY,
-          type: 'scatter',
+          type: 'scattergl',
           mode: 'lines',
           name: 'Price',
-          line: {{ width: 2 }}
-        }},
-        {{
+          line: { width: 2 }
+        },
+        {
           x: buyX,
           y: buyY,
           type: 'scatter',
           mode: 'markers',
           name: 'Buy',
-          marker: {{ size: 10, symbol: 'triangle-up', color: 'green' }}
-        }},
-        {{
+          marker: { size: 10, symbol: 'triangle-up', color: 'green' }
+        },
+        {
           x: sellX,
           y: sellY,
           type: 'scatter',
           mode: 'markers',
           name: 'Sell',
-          marker: {{ size: 10, symbol: 'triangle-down', color: 'red' }}
-        }}
+          marker: { size: 10, symbol: 'triangle-down', color: 'red' }
+        }
       ];
 
-      const commonLayout = {{
-        margin: {{ l: 50, r: 20, t: 30, b: 40 }},
-        xaxis: {{ type: 'date' }},
-        legend: {{ orientation: 'h' }}
-      }};
+      const commonLayout = {
+        margin: { l: 50, r: 20, t: 30, b: 40 },
+        xaxis: { type: 'date' },
+        legend: { orientation: 'h' }
+      };
 
-      Plotly.newPlot('price', priceTraces, Object.assign({{}}, commonLayout, {{
+      Plotly.newPlot('price', priceTraces, Object.assign({}, commonLayout, {
         title: 'Price with Buy/Sell markers',
-        yaxis: {{ title: 'Price' }}
-      }}), {{ responsive: true }});
+        yaxis: { title: 'Price' }
+      }), { responsive: true });
 
       const smaTraces = [
-        {{
+        {
           x: fastX,
           y: fastY,
-          type: 'scatter',
+          type: 'scattergl',
           mode: 'lines',
           name: 'FastSMA',
-          line: {{ width: 2 }}
-        }},
-        {{
+          line: { width: 2 }
+        },
+        {
           x: slowX,
           y: slowY,
-          type: 'scatter',
+          type: 'scattergl',
           mode: 'lines',
           name: 'SlowSMA',
-          line: {{ width: 2 }}
-        }}
+          line: { width: 2 }
+        }
       ];
 
-      Plotly.newPlot('sma', smaTraces, Object.assign({{}}, commonLayout, {{
+      Plotly.newPlot('sma', smaTraces, Object.assign({}, commonLayout, {
         title: 'SMA',
-        yaxis: {{ title: 'Value' }}
-      }}), {{ responsive: true }});
+        yaxis: { title: 'Value' }
+      }), { responsive: true });
 
       setStatus('Charts loaded.');
-    }}
-
-    (function waitForPlotly(maxWaitMs) {{
-      const started = Date.now();
-      (function tick() {{
-        if (window.Plotly && typeof window.Plotly.newPlot === 'function') {{
-          try {{
-            renderCharts();
-          }} catch (e) {{
-            setStatus('Chart rendering failed: ' + (e && e.message ? e.message : String(e)));
-          }}
-          return;
-        }}
-
-        if (Date.now() - started > maxWaitMs) {{
-          setStatus('Plotly did not load (offline or blocked). Trades table is still shown.');
-          return;
-        }}
-        setTimeout(tick, 100);
-      }})();
-    }})(5000);
+    }
+
+    // The Plotly script above is synchronous, so it either loaded by now or
+    // never will — no need to poll for it.
+    if (window.Plotly && typeof window.Plotly.newPlot === 'function') {
+      renderCharts().catch((e) => {
+        setStatus('Chart rendering failed: ' + (e && e.message ? e.message : String(e)));
+      });
+    } else {
+      setStatus('Plotly did not load (offline or blocked). Trades table is still shown.');
+    }
   </script>
 </body>
 </html>
 """
 
 
+def _write_html(
+    out,
+    *,
+    title: str,
+    price_x: np.ndarray,
+    price_y: np.ndarray,
+    buy_x: np.ndarray,
+    buy_y: np.ndarray,
+    sell_x: np.ndarray,
+    sell_y: np.ndarray,
+    fast_x: np.ndarray,
+    fast_y: np.ndarray,
+    slow_x: np.ndarray,
+    slow_y: np.ndarray,
+    trades_rows_html: str,
+    plotly_js: str | None,
+) -> None:
+    # Self-contained when a local Plotly bundle is inlined; otherwise fall back
+    # to a synchronous CDN tag (some environments, e.g. corporate networks or
+    # VS Code webviews, may block it — the trades table still renders).
+    # Stream fragments to the file handle instead of materializing one giant
+    # f-string, so peak memory stays at the payload size, not 2x.
+    out.write(_HTML_HEAD.format(title=title, trades_rows_html=trades_rows_html))
+
+    # Plotly is loaded after the page content so a blocked/offline bundle never
+    # white-screens the document. Inlining makes the html fully offline-capable
+    # and removes the CDN race entirely.
+    if plotly_js is not None:
+        out.write("  <script>\n")
+        out.write(plotly_js)
+        out.write("\n  </script>\n")
+    else:
+        out.write(_PLOTLY_CDN_TAG)
+
+    out.write(_SCRIPT_PRELUDE)
+
+    for name, arr in (
+        ("priceX", price_x),
+        ("priceY", price_y),
+        ("fastX", fast_x),
+        ("fastY", fast_y),
+        ("slowX", slow_x),
+        ("slowY", slow_y),
+    ):
+        out.write(f'    const {name}B64 = "')
+        out.write(_b64_f64(arr))
+        out.write('";\n')
+
+    out.write(f"""    const buyX   = {_jsarr(buy_x)};
+    const buyY   = {_jsarr(buy_y)};
+    const sellX  = {_jsarr(sell_x)};
+    const sellY  = {_jsarr(sell_y)};""")
+    out.write(_SCRIPT_TAIL)
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description=(
@@ -242,6 +381,32 @@ def main() -> int:
         default=None,
         help="Output html path (default: <input>-viz.html)",
     )
+    parser.add_argument(
+        "--plotly-js",
+        default=None,
+        help=(
+            "Path to a local plotly.min.js to inline into the html for fully offline use "
+            "(default: <tools dir>/plotly.min.js if present, else the Plotly CDN)"
+        ),
+    )
+    parser.add_argument(
+        "--recompute-sma",
+        default=None,
+        metavar="FAST,SLOW",
+        help=(
+            "Recompute FastSMA/SlowSMA from the Price series with the given periods "
+            "(e.g. 20,50) when the json does not include them"
+        ),
+    )
+    parser.add_argument(
+        "--max-points",
+        type=int,
+        default=20000,
+        help=(
+            "LTTB-downsample line series (Price/FastSMA/SlowSMA) longer than this "
+            "many points before embedding; 0 disables (default: 20000)"
+        ),
+    )
 
     args = parser.parse_args()
 
@@ -255,8 +420,19 @@ def main() -> int:
         else input_path.with_suffix("").with_name(input_path.stem + "-viz.html")
     )
 
-    with input_path.open("r", encoding="utf-8") as f:
-        result = json.load(f)
+    if orjson is not None:
+        # mmap lets orjson parse straight out of the page cache without first
+        # copying the whole file into a Python bytes object.
+        with input_path.open("rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    result = orjson.loads(view)
+                finally:
+                    view.release()
+    else:
+        with input_path.open("r", encoding="utf-8") as f:
+            result = json.load(f)
 
     charts = result.get("charts") or {}
     chart = charts.get(args.chart)
@@ -266,31 +442,71 @@ def main() -> int:
 
     series = chart.get("series") or {}
 
-    price_x, price_y = _extract_xy(series.get("Price") or {})
-    fast_x, fast_y = _extract_xy(series.get("FastSMA") or {})
-    slow_x, slow_y = _extract_xy(series.get("SlowSMA") or {})
-    buy_x, buy_y = _extract_xy(series.get("Buy") or {})
-    sell_x, sell_y = _extract_xy(series.get("Sell") or {})
-
-    trades_rows_html, trades = _build_trades_table(buy_x, buy_y, sell_x, sell_y)
+    # np.asarray releases the GIL while converting, so the five series extract
+    # in parallel on large jsons.
+    with ThreadPoolExecutor(max_workers=5) as ex:
+        futures = {
+            name: ex.submit(_extract_xy, series.get(name) or {})
+            for name in ("Price", "FastSMA", "SlowSMA", "Buy", "Sell")
+        }
+    price_x, price_y = futures["Price"].result()
+    fast_x, fast_y = futures["FastSMA"].result()
+    slow_x, slow_y = futures["SlowSMA"].result()
+    buy_x, buy_y = futures["Buy"].result()
+    sell_x, sell_y = futures["Sell"].result()
+
+    if args.recompute_sma:
+        try:
+            fast_n, slow_n = (int(p) for p in args.recompute_sma.split(","))
+        except ValueError:
+            raise SystemExit(f"Invalid --recompute-sma '{args.recompute_sma}', expected FAST,SLOW (e.g. 20,50)")
+        # Only fill in series the json is missing; trust embedded ones otherwise.
+        if not len(fast_y) and len(price_y) >= fast_n:
+            fast_x, fast_y = price_x[fast_n - 1:], _sma(price_y, fast_n)
+        if not len(slow_y) and len(price_y) >= slow_n:
+            slow_x, slow_y = price_x[slow_n - 1:], _sma(price_y, slow_n)
+
+    # Downsample long line series; Buy/Sell are sparse event markers and must
+    # stay exact.
+    if args.max_points > 0:
+        price_x, price_y = _lttb(price_x, price_y, args.max_points)
+        fast_x, fast_y = _lttb(fast_x, fast_y, args.max_points)
+        slow_x, slow_y = _lttb(slow_x, slow_y, args.max_points)
+
+    if args.plotly_js:
+        plotly_js_path = Path(args.plotly_js).expanduser().resolve()
+        if not plotly_js_path.exists():
+            raise SystemExit(f"Plotly bundle not found: {plotly_js_path}")
+    else:
+        plotly_js_path = Path(__file__).resolve().parent / "plotly.min.js"
+    plotly_js = plotly_js_path.read_text(encoding="utf-8") if plotly_js_path.exists() else None
+
+    events = _trade_events(buy_x, buy_y, sell_x, sell_y)
+    buys = events[events.s > 0]
+    sells = events[events.s < 0]
+    buy_x, buy_y = buys.t, buys.p
+    sell_x, sell_y = sells.t, sells.p
+
+    trades_rows_html, trades = _build_trades_table(events)
 
     title = f"LEAN Backtest: {args.chart} (Price + Trades + SMA)"
-    html = _build_html(
-        title=title,
-        price_x=price_x,
-        price_y=price_y,
-        buy_x=buy_x,
-        buy_y=buy_y,
-        sell_x=sell_x,
-        sell_y=sell_y,
-        fast_x=fast_x,
-        fast_y=fast_y,
-        slow_x=slow_x,
-        slow_y=slow_y,
-        trades_rows_html=trades_rows_html,
-    )
-
-    output_path.write_text(html, encoding="utf-8")
+    with output_path.open("w", encoding="utf-8", buffering=1 << 20) as out:
+        _write_html(
+            out,
+            title=title,
+            price_x=price_x,
+            price_y=price_y,
+            buy_x=buy_x,
+            buy_y=buy_y,
+            sell_x=sell_x,
+            sell_y=sell_y,
+            fast_x=fast_x,
+            fast_y=fast_y,
+            slow_x=slow_x,
+            slow_y=slow_y,
+            trades_rows_html=trades_rows_html,
+            plotly_js=plotly_js,
+        )
 
     if trades:
         print("Trades (UTC):")